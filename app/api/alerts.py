@@ -1,17 +1,35 @@
 """Alerts API endpoints"""
 
 import logging
+from typing import Optional
 
-from fastapi import APIRouter, Query
+import orjson
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
 
-from app.redis_client import get_redis_client
+from app.api.caching import (
+    cache_headers,
+    cached_json_response,
+    etag_matches,
+    not_modified_response,
+)
+from app.redis_client import (
+    DECISIONS_HASH_KEY,
+    DECISIONS_HISTORY_LIST_KEY,
+    RedisClient,
+    get_redis_client,
+    parse_history_cursor,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Pages larger than this are streamed in chunks of this size instead of built in memory
+HISTORY_STREAM_CHUNK = 100
+
 
 @router.get("/decisions")
-async def get_latest_decisions():
+async def get_latest_decisions(request: Request):
     """
     Get the latest decisions from Redis.
     
@@ -23,25 +41,39 @@ async def get_latest_decisions():
     - longitude: Attack source longitude
     - cn: ISO 3166-1 alpha-2 country code
     - timestamp: ISO 8601 timestamp
+
+    Supports conditional requests: responses carry an ETag and a matching
+    If-None-Match header yields 304 Not Modified.
     """
 
     try:
         redis_client = get_redis_client()
-        decisions = redis_client.get_latest_decisions(count=20)
-        return {"status": "success", "decision": decisions}
+        etag = await redis_client.get_etag(DECISIONS_HASH_KEY)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
+        decisions = await redis_client.get_latest_decisions(count=20)
+        return cached_json_response({"status": "success", "decision": decisions}, etag)
     except Exception as e:
         logger.error(f"Error fetching decisions: {e}")
         return {"status": "error", "message": str(e)}
 
 
 @router.get("/decisions/history")
-async def get_decision_history(limit: int = Query(100, ge=1, le=1000), offset: int = Query(0, ge=0)):
+async def get_decision_history(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0, le=5000),
+    cursor: Optional[str] = Query(None, max_length=256),
+):
     """
     Get paginated decision history from Redis.
     
     Query Parameters:
     - limit: Number of decisions to return (default: 100, max: 1000)
-    - offset: Number of decisions to skip (default: 0)
+    - offset: Number of decisions to skip (default: 0, max: 5000)
+    - cursor: `next_cursor` from a previous page (opaque string); when set, `offset`
+      is ignored and the page starts right after that decision (use this for deep pagination)
     
     Returns decisions as a list of dictionaries where each decision has its unique ID as a key.
     Format: [{"unique_decision_id_1": {...}}, {"unique_decision_id_2": {...}}]
@@ -51,23 +83,95 @@ async def get_decision_history(limit: int = Query(100, ge=1, le=1000), offset: i
     - longitude: Attack source longitude
     - cn: ISO 3166-1 alpha-2 country code
     - timestamp: ISO 8601 timestamp
+
+    Supports conditional requests: responses carry an ETag and a matching
+    If-None-Match header yields 304 Not Modified.
+
+    Offset-based pages larger than 100 decisions are streamed in chunks.
     """
 
+    if cursor is not None:
+        try:
+            parse_history_cursor(cursor)
+        except ValueError:
+            return {"status": "error", "message": "Invalid cursor"}
+
     try:
         redis_client = get_redis_client()
-        decisions = redis_client.get_decision_history(limit=limit, offset=offset)
-        total_count = redis_client.get_history_count()
-        
-        return {
-            "status": "success",
-            "decision": decisions,
-            "pagination": {
-                "limit": limit,
-                "offset": offset,
-                "total": total_count,
-                "returned": len(decisions)
-            }
-        }
+        etag = await redis_client.get_etag(DECISIONS_HISTORY_LIST_KEY)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
+        if cursor is None and limit > HISTORY_STREAM_CHUNK:
+            total_count = await redis_client.get_history_count()
+            if offset >= total_count:
+                return cached_json_response(
+                    {
+                        "status": "success",
+                        "decision": [],
+                        "pagination": {
+                            "limit": limit,
+                            "offset": offset,
+                            "total": total_count,
+                            "returned": 0,
+                            "next_cursor": None,
+                        },
+                    },
+                    etag,
+                )
+            return StreamingResponse(
+                _stream_history(redis_client, limit, offset, total_count),
+                media_type="application/json",
+                headers=cache_headers(etag),
+            )
+
+        if cursor is not None:
+            decisions, total_count, next_cursor = await redis_client.get_decision_history_by_cursor(
+                cursor=cursor, limit=limit
+            )
+        else:
+            decisions, total_count, next_cursor = await redis_client.get_history_page(
+                limit=limit, offset=offset
+            )
+
+        return cached_json_response(
+            {
+                "status": "success",
+                "decision": decisions,
+                "pagination": {
+                    "limit": limit,
+                    "offset": offset,
+                    "total": total_count,
+                    "returned": len(decisions),
+                    "next_cursor": next_cursor,
+                },
+            },
+            etag,
+        )
     except Exception as e:
         logger.error(f"Error fetching decision history: {e}")
         return {"status": "error", "message": str(e)}
+
+
+async def _stream_history(redis_client: RedisClient, limit: int, offset: int, total_count: int):
+    """Encode a history page chunk by chunk, in the same shape as the buffered response"""
+    yield b'{"status":"success","decision":['
+    returned = 0
+    next_cursor = None
+    async for decisions, chunk_cursor in redis_client.iter_history(
+        limit=limit, offset=offset, chunk=HISTORY_STREAM_CHUNK
+    ):
+        if decisions:
+            body = b",".join(orjson.dumps(decision) for decision in decisions)
+            yield body if returned == 0 else b"," + body
+            returned += len(decisions)
+        next_cursor = chunk_cursor
+
+    pagination = {
+        "limit": limit,
+        "offset": offset,
+        "total": total_count,
+        "returned": returned,
+        "next_cursor": next_cursor,
+    }
+    yield b'],"pagination":' + orjson.dumps(pagination) + b"}"
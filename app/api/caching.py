@@ -0,0 +1,55 @@
+"""HTTP caching helpers for polled API endpoints"""
+
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import Request, Response
+
+# Decisions arrive at most about once per second, so allow caches to reuse a body for 1s
+CACHE_CONTROL = "public, max-age=1"
+
+
+def _strip_weak(tag: str) -> str:
+    """Remove the weak validator prefix for weak ETag comparison"""
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Check whether the request's If-None-Match header matches the given ETag"""
+    if etag is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    expected = _strip_weak(etag)
+    return any(
+        _strip_weak(candidate.strip()) == expected
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified_response(etag: str, cache_control: str = CACHE_CONTROL) -> Response:
+    """Build an empty 304 response carrying the caching headers"""
+    return Response(
+        status_code=304,
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
+
+
+def cache_headers(etag: Optional[str]) -> Dict[str, str]:
+    """Build the Cache-Control and (if available) ETag headers"""
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if etag is not None:
+        headers["ETag"] = etag
+    return headers
+
+
+def cached_json_response(content: Any, etag: Optional[str]) -> Response:
+    """Build an orjson-encoded JSON response with ETag and Cache-Control headers"""
+    return Response(
+        content=orjson.dumps(content),
+        media_type="application/json",
+        headers=cache_headers(etag),
+    )
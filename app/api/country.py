@@ -1,17 +1,27 @@
 """Country aggregation API endpoints"""
 
 import logging
+from typing import Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request
 
-from app.redis_client import get_redis_client
+from app.api.caching import cached_json_response, etag_matches, not_modified_response
+from app.redis_client import (
+    COUNTRY_HASH_KEY,
+    GEOHASH_COUNTS_KEY,
+    GEOHASH_PRECISION,
+    get_redis_client,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
 @router.get("/country")
-async def get_country_stats():
+async def get_country_stats(
+    request: Request,
+    top: Optional[int] = Query(None, ge=1, le=250),
+):
     """
     Get aggregated attack counts by country.
     
@@ -22,13 +32,61 @@ async def get_country_stats():
     - Country code (ISO 3166-1 alpha-2): number of attacks
     
     Results are sorted by count (highest first).
+
+    Query Parameters:
+    - top: Only return the N countries with the most attacks (default: all, max: 250)
+
+    Supports conditional requests: responses carry an ETag and a matching
+    If-None-Match header yields 304 Not Modified.
     """
     redis_client = get_redis_client()
     if not redis_client:
         return {"status": "error", "message": "Redis client not initialized"}
 
     try:
-        return redis_client.get_decisions_by_country()
+        etag = await redis_client.get_etag(COUNTRY_HASH_KEY)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
+        # The body may come from the short-lived cache: send the ETag it was built with
+        result, etag = await redis_client.get_decisions_by_country(top=top)
+        if result.get("status") != "success":
+            return result
+        return cached_json_response(result, etag)
     except Exception as e:
         logger.error(f"Error fetching country decisions: {e}")
         return {"status": "error", "message": "Failed to fetch country decisions"}
+
+
+@router.get("/country/heatmap")
+async def get_country_heatmap(
+    request: Request,
+    precision: int = Query(5, ge=1, le=GEOHASH_PRECISION),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Get attack counts clustered by geohash cell for heatmap rendering.
+
+    Query Parameters:
+    - precision: Geohash length used for clustering, lower = larger cells (default: 5, max: 7)
+    - limit: Maximum number of clusters to return (default: 100, max: 1000)
+
+    Format: [{"geohash": "u33dc", "latitude": 52.5, "longitude": 13.4, "count": 12}, ...]
+
+    Latitude and longitude are the center of the geohash cell.
+    Results are sorted by count (highest first).
+    """
+    try:
+        redis_client = get_redis_client()
+        etag = await redis_client.get_etag(GEOHASH_COUNTS_KEY)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
+        clusters = await redis_client.get_geohash_clusters(precision=precision, limit=limit)
+        return cached_json_response(
+            {"status": "success", "precision": precision, "clusters": clusters},
+            etag,
+        )
+    except Exception as e:
+        logger.error(f"Error fetching geohash clusters: {e}")
+        return {"status": "error", "message": "Failed to fetch geohash clusters"}
@@ -1,31 +1,48 @@
 """Health check endpoint"""
 
-import logging
-
-from fastapi import APIRouter
+import orjson
+from fastapi import APIRouter, Request, Response
 
 from app.redis_client import get_redis_client
 
 router = APIRouter()
-logger = logging.getLogger(__name__)
+
+# Static liveness payload, serialized once
+HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "Sectacho API"})
+
+
+async def health_check(request: Request) -> Response:
+    """
+    Health check endpoint.
+
+    Registered as a plain Starlette route (see below), so liveness probes skip
+    FastAPI's dependency resolution and response serialization.
+    """
+    return Response(content=HEALTH_BODY, media_type="application/json")
 
 
-@router.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "service": "Sectacho API"}
+router.add_route("/health", health_check, methods=["GET"], include_in_schema=False)
 
 
 @router.get("/health/redis")
 async def health_check_redis():
-    """Redis health check"""
-    try:
-        redis_client = get_redis_client()
-        if redis_client.redis_client:
-            redis_client.redis_client.ping()
-            return {"status": "healthy", "redis": "connected"}
-        else:
-            return {"status": "unhealthy", "redis": "not initialized"}
-    except Exception as e:
-        logger.error(f"Redis health check failed: {e}")
-        return {"status": "unhealthy", "redis": "connection failed"}
+    """
+    Redis health check.
+
+    Reports the liveness flag maintained by the Redis client's background
+    health check task, so this endpoint never issues a Redis command itself.
+    """
+    redis_client = get_redis_client()
+    if redis_client.health_checked_at is None:
+        return {"status": "unhealthy", "redis": "not initialized"}
+    if redis_client.healthy:
+        return {
+            "status": "healthy",
+            "redis": "connected",
+            "checked_at": redis_client.health_checked_at,
+        }
+    return {
+        "status": "unhealthy",
+        "redis": "connection failed",
+        "checked_at": redis_client.health_checked_at,
+    }
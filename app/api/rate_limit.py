@@ -0,0 +1,81 @@
+"""In-process per-client rate limiting"""
+
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+from fastapi import HTTPException, Request
+
+# Number of client buckets kept before the least recently seen ones are dropped
+MAX_TRACKED_CLIENTS = 10000
+
+# Most buckets dropped to make room for one new client, bounds the work per request
+EVICTION_BATCH = 100
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per client key.
+
+    Each client may burst up to ``capacity`` requests; tokens refill at ``rate``
+    per second. ``allow`` never awaits, so on a single event loop no lock is
+    needed: every check runs to completion before the next request is handled.
+    """
+
+    __slots__ = ("rate", "capacity", "_buckets")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = float(capacity)
+        # key -> (tokens, time.monotonic() of last update), least recently seen first
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def allow(self, key: str) -> bool:
+        """Take one token for ``key``; return False if its bucket is empty"""
+        now = time.monotonic()
+        # Popped and re-inserted below, which moves the key to the most recent end
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_CLIENTS:
+                self._evict(now)
+            tokens = self.capacity
+        else:
+            tokens, updated_at = bucket
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+
+        if tokens < 1.0:
+            self._buckets[key] = (tokens, now)
+            return False
+        self._buckets[key] = (tokens - 1.0, now)
+        return True
+
+    def _evict(self, now: float) -> None:
+        """
+        Drop up to EVICTION_BATCH least recently seen buckets that have refilled
+        completely, they behave like new ones. Buckets are ordered by last update,
+        so the scan stops at the first one still refilling; if none has refilled,
+        the least recently seen bucket is dropped anyway to stay within
+        MAX_TRACKED_CLIENTS.
+        """
+        refill_time = self.capacity / self.rate
+        for _ in range(min(EVICTION_BATCH, len(self._buckets))):
+            _, updated_at = next(iter(self._buckets.values()))
+            if now - updated_at < refill_time:
+                break
+            self._buckets.popitem(last=False)
+        if len(self._buckets) >= MAX_TRACKED_CLIENTS:
+            self._buckets.popitem(last=False)
+
+
+async def rate_limit(request: Request) -> None:
+    """FastAPI dependency rejecting requests over the client's rate limit with 429"""
+    limiter = getattr(request.app.state, "limiter", None)
+    if limiter is None:
+        return
+    client = request.client.host if request.client else "unknown"
+    if not limiter.allow(client):
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, round(1 / limiter.rate)))},
+        )
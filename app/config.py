@@ -4,9 +4,12 @@ Loads settings from environment variables
 """
 
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import AliasChoices, Field
 import os
+import tempfile
+from functools import cached_property, lru_cache
 from pathlib import Path
+from typing import Tuple
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from datetime import timezone as _utc_timezone
 import logging
@@ -25,6 +28,17 @@ class Settings(BaseSettings):
     api_host: str = Field(default="0.0.0.0", alias="API_HOST")
     api_port: int = Field(default=8000, alias="API_PORT")
     debug: bool = Field(default=False, alias="DEBUG")
+    env: str = Field(default="dev", alias="ENV")
+    api_workers: int = Field(
+        default=1, validation_alias=AliasChoices("API_WORKERS", "WEB_CONCURRENCY")
+    )
+
+    # CrowdSec stream listener
+    run_stream_listener: bool = Field(default=True, alias="RUN_STREAM_LISTENER")
+    stream_lock_file: str = Field(
+        default_factory=lambda: os.path.join(tempfile.gettempdir(), "sec-dash-stream.lock"),
+        alias="STREAM_LOCK_FILE",
+    )
 
     # Security
     secret_key: str = Field(default="change-me-in-production", alias="SECRET_KEY")
@@ -38,9 +52,15 @@ class Settings(BaseSettings):
     redis_port: int = Field(default=6379, alias="REDIS_PORT")
     redis_db: int = Field(default=0, alias="REDIS_DB")
     redis_password: str = Field(default="", alias="REDIS_PASSWORD")
+    redis_max_connections: int = Field(default=64, alias="REDIS_MAX_CONNECTIONS")
+
+    # Rate limiting (per client IP; 0 disables it)
+    rate_limit_per_second: float = Field(default=0.0, alias="RATE_LIMIT_PER_SECOND")
+    rate_limit_burst: int = Field(default=20, alias="RATE_LIMIT_BURST")
 
     # CORS
     cors_origins: str = Field(default="*", alias="CORS_ORIGINS")
+    cors_allow_credentials: bool = Field(default=True, alias="CORS_ALLOW_CREDENTIALS")
 
     # Timezone (default Europe/Berlin)
     timezone: str = Field(default="Europe/Berlin", alias="TIMEZONE")
@@ -50,7 +70,7 @@ class Settings(BaseSettings):
         env_file_encoding = "utf-8"
         case_sensitive = False
 
-    @property
+    @cached_property
     def redis_url(self) -> str:
         """Construct Redis connection URL"""
         if self.redis_password:
@@ -58,6 +78,19 @@ class Settings(BaseSettings):
         return f"redis://{self.redis_host}:{self.redis_port}/{self.redis_db}"
 
     @property
+    def is_production(self) -> bool:
+        """Whether the app runs in production (ENV=prod)"""
+        return self.env.lower() == "prod"
+
+    @cached_property
+    def cors_origin_list(self) -> Tuple[str, ...]:
+        """CORS origins, stripped and deduplicated; ("*",) if any entry is a wildcard"""
+        origins = tuple(dict.fromkeys(o.strip() for o in self.cors_origins.split(",") if o.strip()))
+        if not origins or "*" in origins:
+            return ("*",)
+        return origins
+
+    @cached_property
     def tls_cert_path(self) -> Path:
         """Get absolute path to TLS certificate"""
         path = Path(self.crowdsec_tls_cert)
@@ -65,7 +98,7 @@ class Settings(BaseSettings):
             path = Path(__file__).parent.parent / path
         return path.resolve()
 
-    @property
+    @cached_property
     def tls_key_path(self) -> Path:
         """Get absolute path to TLS key"""
         path = Path(self.crowdsec_tls_key)
@@ -73,7 +106,7 @@ class Settings(BaseSettings):
             path = Path(__file__).parent.parent / path
         return path.resolve()
 
-    @property
+    @cached_property
     def tls_ca_path(self) -> Path:
         """Get absolute path to TLS CA certificate"""
         path = Path(self.crowdsec_tls_ca)
@@ -81,11 +114,12 @@ class Settings(BaseSettings):
             path = Path(__file__).parent.parent / path
         return path.resolve()
 
-    @property
+    @cached_property
     def tz(self) -> ZoneInfo:
         """Return a zoneinfo.ZoneInfo instance for the configured timezone.
 
-        Falls back to UTC if the configured timezone is invalid.
+        Falls back to UTC if the configured timezone is invalid. The result is
+        computed once and cached on the settings instance.
         """
         try:
             return ZoneInfo(self.timezone)
@@ -103,6 +137,11 @@ class Settings(BaseSettings):
             )
             return _utc_timezone.utc
 
+    @cached_property
+    def tls_validation(self) -> Tuple[bool, str]:
+        """Result of validate_tls_certificates(), computed once per process"""
+        return self.validate_tls_certificates()
+
     def validate_tls_certificates(self):
         """Validate that TLS certificate files exist and are readable"""
         errors = []
@@ -127,5 +166,11 @@ class Settings(BaseSettings):
         return True, "All TLS certificates are accessible"
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings, read from the environment once"""
+    return Settings()
+
+
 # Load settings
-settings = Settings()
+settings = get_settings()
@@ -1,25 +1,127 @@
 """CrowdSec API Client with stream listener"""
 
+import asyncio
 import logging
+import random
+import ssl
+import time
+import traceback
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime as _datetime_type
 
-import requests
-from requests.exceptions import RequestException, Timeout
+import httpx
+import orjson
 
 from app.config import settings
 from app.redis_client import get_redis_client
 
 logger = logging.getLogger(__name__)
 
+# Renew the API key this many seconds before it expires
+KEY_RENEWAL_MARGIN = 300.0
+# Interval in seconds between "Renewal in" log lines
+RENEWAL_LOG_INTERVAL = 300.0
+
+# Connection pool size and connect retries for the CrowdSec HTTP transport
+HTTP_POOL_SIZE = 4
+HTTP_CONNECT_RETRIES = 3
+
+# Retries for timeouts and 5xx responses, with exponential backoff and full jitter
+HTTP_REQUEST_RETRIES = 2
+HTTP_BACKOFF_BASE = 0.5
+HTTP_BACKOFF_CAP = 10.0
+
+# Backoff of the stream loop after failed polls
+STREAM_BACKOFF_BASE = 5.0
+STREAM_BACKOFF_CAP = 120.0
+
+# Open the circuit after this many failed requests in a row, probe again after reset
+BREAKER_FAIL_THRESHOLD = 5
+BREAKER_RESET_AFTER = 30.0
+
+# Static request headers; the Authorization header is added per client
+BASE_HEADERS: Dict[str, str] = {
+    "Content-Type": "application/json",
+    "User-Agent": "Sectacho/0.1.0",
+}
+
+
+def _backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff delay for the given attempt (0-based) with jitter"""
+    return min(cap, base * 2 ** min(attempt, 32)) * random.uniform(0.5, 1.5)
+
+
+async def _wait_for_stop(stop_event: asyncio.Event, delay: float) -> None:
+    """Sleep for ``delay`` seconds, returning early once ``stop_event`` is set"""
+    try:
+        await asyncio.wait_for(stop_event.wait(), delay)
+    except asyncio.TimeoutError:
+        pass
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for requests to CrowdSec.
+
+    CLOSED: requests pass, failures are counted.
+    OPEN: requests are skipped until ``reset_after`` seconds have passed.
+    HALF_OPEN: requests pass as probes; a success closes the circuit,
+    a failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, fail_threshold: int = BREAKER_FAIL_THRESHOLD, reset_after: float = BREAKER_RESET_AFTER):
+        self.fail_threshold = fail_threshold
+        self.reset_after = reset_after
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return whether a request may be sent now"""
+        if self._state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_after:
+                return False
+            self._state = self.HALF_OPEN
+            logger.info("Circuit breaker half-open, probing CrowdSec")
+        return True
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info("Circuit breaker closed")
+        self._state = self.CLOSED
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.fail_threshold:
+            if self._state != self.OPEN:
+                logger.warning(
+                    "Circuit breaker open after %d failure(s), pausing requests for %.0fs",
+                    self._failures,
+                    self.reset_after,
+                )
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
 
 class CrowdSecClient:
     """Client for interacting with CrowdSec API"""
 
     API_KEY: str = ""
     KEY_RENEWAL_AT: Optional[_datetime_type] = None
-    last_decision_id: Optional[str] = None
+    last_decision_id: Optional[int] = None
+    # time.monotonic() deadline for the next API key renewal
+    _next_renewal_monotonic: Optional[float] = None
+    _last_renewal_print: Optional[float] = None
 
     def __init__(self):
         self.base_url = settings.crowdsec_host.rstrip("/")
@@ -27,38 +129,71 @@ class CrowdSecClient:
         self.tls_key = str(settings.tls_key_path)
         self.tls_ca = str(settings.tls_ca_path)
         self.timeout = 30
-
-        # Validate TLS certificates on initialization
-        is_valid, message = settings.validate_tls_certificates()
+        # Request headers, built once; only Authorization is updated on API key renewal
+        self._headers: Dict[str, str] = {**BASE_HEADERS, "Authorization": f"Bearer {self.API_KEY}"}
+        self._breaker = CircuitBreaker()
+        # Status code of the last request that failed with an HTTP error response
+        self.last_error_status: Optional[int] = None
+
+        # Validate TLS certificates (memoized on the settings instance)
+        is_valid, message = settings.tls_validation
         if not is_valid:
-            logger.error(f"TLS Certificate Validation Failed:\n{message}")
+            logger.error("TLS Certificate Validation Failed:\n%s", message)
         else:
-            logger.info(f"TLS Certificates validated successfully")
-            logger.debug(f"Using certificate: {self.tls_cert}")
-            logger.debug(f"Using key: {self.tls_key}")
-            logger.debug(f"Using CA: {self.tls_ca}")
-
-    def _get_headers(self) -> Dict[str, str]:
-        """Get headers for API requests"""
-        return {
-            "Content-Type": "application/json",
-            "User-Agent": "Sectacho/0.1.0",
-            "Authorization": f"Bearer {self.API_KEY}",
-        }
-
-    def _make_request(
+            logger.info("TLS Certificates validated successfully")
+            logger.debug("Using certificate: %s", self.tls_cert)
+            logger.debug("Using key: %s", self.tls_key)
+            logger.debug("Using CA: %s", self.tls_ca)
+
+        # Persistent HTTP/2 client so the mTLS session is reused across requests.
+        # The transport keeps a small keep-alive pool and retries failed connects.
+        transport = httpx.AsyncHTTPTransport(
+            verify=self._build_ssl_context(),
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_SIZE,
+                max_keepalive_connections=HTTP_POOL_SIZE,
+            ),
+            retries=HTTP_CONNECT_RETRIES,
+        )
+        self._client = httpx.AsyncClient(
+            transport=transport,
+            timeout=self.timeout,
+            headers={"User-Agent": BASE_HEADERS["User-Agent"]},
+        )
+
+    def _build_ssl_context(self) -> ssl.SSLContext:
+        """Build the SSL context with the CA and client certificate for mTLS"""
+        try:
+            context = ssl.create_default_context(cafile=self.tls_ca)
+            context.load_cert_chain(self.tls_cert, self.tls_key)
+            return context
+        except (OSError, ssl.SSLError) as e:
+            logger.error("Failed to load TLS certificates: %s", e)
+            return ssl.create_default_context()
+
+    async def close(self) -> None:
+        """Close the underlying HTTP client"""
+        await self._client.aclose()
+
+    async def _make_request(
         self,
         method: str,
         url: str,
         headers: Dict[str, str],
         params: Optional[Dict[str, Any]] = None,
         json: Optional[Dict[str, Any]] = None,
-        stream: bool = False,
         timeout: int = 30,
         data: Optional[str] = None,
     ):
         """
-        Make synchronous HTTP request using requests library
+        Make asynchronous HTTP request using the shared httpx client
+
+        Timeouts, connection errors and 5xx responses are retried with
+        exponential backoff and count against the circuit breaker; while it is
+        open, requests are skipped. 4xx responses (e.g. an expired API key) are
+        returned as failures right away and do not trip the breaker; the status
+        code of a failed response is kept in ``last_error_status``.
 
         Args:
             method: HTTP method (GET, POST, DELETE, etc.)
@@ -66,57 +201,86 @@ class CrowdSecClient:
             headers: Request headers
             params: Query parameters
             json: JSON payload
-            stream: Whether to stream the response
+            timeout: Request timeout in seconds
+            data: Raw request body
 
         Returns:
-            Response object or iterator if streaming
+            Response object, or None on failure
         """
-        try:
-            # Make the request
-            response = requests.request(
-                method=method,
-                url=url,
-                cert=(self.tls_cert, self.tls_key),
-                verify=self.tls_ca,
-                headers=headers,
-                params=params,
-                json=json,
-                timeout=timeout,
-                stream=stream,
-                data=data,
-            )
+        self.last_error_status = None
+        if not self._breaker.allow_request():
+            logger.debug("Circuit breaker open, skipping %s request to %s", method, url)
+            return None
 
-            response.raise_for_status()
-            return response
+        for attempt in range(HTTP_REQUEST_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(_backoff_delay(attempt - 1, HTTP_BACKOFF_BASE, HTTP_BACKOFF_CAP))
+            try:
+                # Make the request
+                response = await self._client.request(
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    params=params,
+                    json=json,
+                    timeout=timeout,
+                    content=data,
+                )
+
+                response.raise_for_status()
+                self._breaker.record_success()
+                return response
+
+            except httpx.TimeoutException as e:
+                logger.error("Timeout during %s request to %s: %s", method, url, e)
+            except httpx.HTTPStatusError as e:
+                logger.error("HTTP error during %s request to %s: %s", method, url, e)
+                logger.error("Response status: %s", e.response.status_code)
+                self.last_error_status = e.response.status_code
+                if e.response.status_code < 500:
+                    return None
+            except httpx.HTTPError as e:
+                logger.error("HTTP error during %s request to %s: %s", method, url, e)
+            except Exception as e:
+                logger.error(
+                    "Unexpected error during %s request: %s: %s", method, type(e).__name__, e
+                )
+                logger.debug("Traceback: %s", traceback.format_exc())
+                return None
 
-        except Timeout as e:
-            logger.error(f"Timeout during {method} request to {url}: {e}")
-            return None
-        except RequestException as e:
-            logger.error(f"HTTP error during {method} request to {url}: {e}")
-            if hasattr(e, "response") and e.response is not None:
-                logger.error(f"Response status: {e.response.status_code}")
-            return None
-        except Exception as e:
-            logger.error(
-                f"Unexpected error during {method} request: {type(e).__name__}: {e}"
-            )
-            import traceback
+        self._breaker.record_failure()
+        return None
 
-            logger.debug(f"Traceback: {traceback.format_exc()}")
-            return None
+    def _new_alerts(self, alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Return the alerts that have not been processed yet, oldest first.
 
-    def stream_decisions(self) -> None:
+        CrowdSec returns alerts newest first with increasing IDs. On the first
+        poll only the newest alert is taken, matching the previous behaviour.
+        """
+        if not alerts:
+            return []
+        if self.last_decision_id is None:
+            return alerts[:1]
+        new_alerts = [alert for alert in alerts if alert["id"] > self.last_decision_id]
+        new_alerts.sort(key=lambda alert: alert["id"])
+        return new_alerts
+
+    async def stream_decisions(self, stop_event: Optional[asyncio.Event] = None) -> None:
         """
         Stream decisions from CrowdSec /decisions/stream endpoint
-        This is a blocking call that continuously listens for new decisions
+        This coroutine runs until ``stop_event`` is set (or it is cancelled),
+        continuously listening for new decisions. A poll that is in progress
+        when the event is set is finished, including its Redis writes.
         """
+        if stop_event is None:
+            stop_event = asyncio.Event()
 
-        def get_apikey():
-            response = self._make_request(
+        async def get_apikey():
+            response = await self._make_request(
                 "POST",
                 f"{self.base_url}/v1/watchers/login",
-                self._get_headers(),
+                self._headers,
                 data="""{
                     "scenarios": [
                         "ban"
@@ -125,7 +289,7 @@ class CrowdSecClient:
             )
             if response is None:
                 logger.error("Failed to obtain API key")
-                return
+                return False
 
             response_data = response.json()
             # Parse expire time in a timezone-aware manner; if missing, set to now + 10min
@@ -144,68 +308,91 @@ class CrowdSecClient:
                     expire_dt = datetime.now(settings.tz) + timedelta(minutes=10)
 
             self.KEY_RENEWAL_AT = expire_dt.astimezone(settings.tz).replace(microsecond=0)
+            self._next_renewal_monotonic = (
+                time.monotonic()
+                + (self.KEY_RENEWAL_AT - datetime.now(settings.tz)).total_seconds()
+                - KEY_RENEWAL_MARGIN
+            )
             self.API_KEY = response_data.get("token", "")
-            logger.info(f"Obtained API key for decision stream: {self.API_KEY}")
+            self._headers["Authorization"] = f"Bearer {self.API_KEY}"
+            logger.info("Obtained API key for decision stream: %s", self.API_KEY)
+            logger.info("API key will be renewed at %s", self.KEY_RENEWAL_AT.isoformat())
+            return True
 
         url = f"{self.base_url}/v1/alerts?simulated=false&has_active_decision=true&limit=10"
-        headers = self._get_headers()
         redis_client = get_redis_client()
 
-        get_apikey()
-        if self.KEY_RENEWAL_AT:
-            logger.info(f"API key will be renewed at {self.KEY_RENEWAL_AT.isoformat()}")
-
-        logger.info(f"Starting CrowdSec decision stream from {url}")
-        while True:
-            now = datetime.now(settings.tz)
-            if getattr(self, "_last_renewal_print", None) is None or now - self._last_renewal_print >= timedelta(
-                minutes=5
-            ):
-                if self.KEY_RENEWAL_AT:
-                    renewal_in = self.KEY_RENEWAL_AT - timedelta(minutes=5) - now
-                    logger.info(f"Renewal in: {renewal_in}")
+        # No API key yet: the loop logs in first, and retries the login with
+        # backoff until it succeeds (e.g. while LAPI is still starting)
+        self._next_renewal_monotonic = None
+
+        logger.info("Starting CrowdSec decision stream from %s", url)
+        failures = 0
+        while not stop_event.is_set():
+            now = time.monotonic()
+            if self._last_renewal_print is None or now - self._last_renewal_print >= RENEWAL_LOG_INTERVAL:
+                if self._next_renewal_monotonic is not None:
+                    renewal_in = timedelta(seconds=int(self._next_renewal_monotonic - now))
+                    logger.info("Renewal in: %s", renewal_in)
                 self._last_renewal_print = now
-            if self.KEY_RENEWAL_AT and now >= (self.KEY_RENEWAL_AT - timedelta(minutes=5)):
+            if self._next_renewal_monotonic is None or now >= self._next_renewal_monotonic:
                 logger.info("Renewing API key for decision stream")
-                get_apikey()
+                if not await get_apikey():
+                    delay = _backoff_delay(failures, STREAM_BACKOFF_BASE, STREAM_BACKOFF_CAP)
+                    failures += 1
+                    logger.error("Failed to log in to CrowdSec, retrying in %.1f seconds...", delay)
+                    await _wait_for_stop(stop_event, delay)
                 continue
             try:
-                headers = self._get_headers()  # Refresh headers with current API_KEY
-                response = self._make_request("GET", url, headers)
+                response = await self._make_request("GET", url, self._headers)
 
                 if response is None:
+                    if self.last_error_status == 401:
+                        # API key rejected (expired early, or LAPI restarted): log in again
+                        logger.warning("API key rejected by CrowdSec, renewing it")
+                        self._next_renewal_monotonic = None
+                    delay = _backoff_delay(failures, STREAM_BACKOFF_BASE, STREAM_BACKOFF_CAP)
+                    failures += 1
                     logger.error(
-                        "Failed to connect to decisions stream, retrying in 5 seconds..."
+                        "Failed to connect to decisions stream, retrying in %.1f seconds...", delay
                     )
-                    import time
+                    await _wait_for_stop(stop_event, delay)
+                    continue
+                failures = 0
 
-                    time.sleep(5)
+                new_alerts = self._new_alerts(orjson.loads(response.content))
+                if not new_alerts:
+                    await _wait_for_stop(stop_event, 1.25)
                     continue
-                
-                json_data = response.json()
-                if not self.last_decision_id == json_data[0]["id"]:
-                    self.last_decision_id = json_data[0]["id"]
-                    # Get current timestamp in ISO format
-                    timestamp = datetime.now(settings.tz).isoformat()
+
+                # Current time as epoch milliseconds (rendered as ISO 8601 when read)
+                timestamp = int(time.time() * 1000)
+                batch = []
+                for alert in new_alerts:
+                    # Sources without GeoIP data (private IPs, ranges) have no
+                    # coordinates or country; they are stored without geo data
+                    source = alert.get("source") or {}
                     data = {
-                        "latitude": json_data[0]["source"]["latitude"],
-                        "longitude": json_data[0]["source"]["longitude"],
-                        "cn": json_data[0]["source"]["cn"],
+                        "latitude": source.get("latitude"),
+                        "longitude": source.get("longitude"),
+                        "cn": source.get("cn"),
                         "timestamp": timestamp,
                     }
                     # Use CrowdSec decision ID as unique identifier
-                    redis_client.add_decision(data, str(json_data[0]["id"]))
-                    logger.info("Added new decision")
-                else:
-                    import time
+                    batch.append((str(alert["id"]), data))
 
-                    time.sleep(1.25)
+                # Write all new decisions of this poll in one batch
+                added = await redis_client.add_decisions(batch)
+                self.last_decision_id = new_alerts[-1]["id"]
+                logger.info("Added %d new decision(s)", added)
 
             except Exception as e:
-                logger.error(f"Error in decision stream: {type(e).__name__}: {e}")
-                import time
+                logger.error("Error in decision stream: %s: %s", type(e).__name__, e)
+                await _wait_for_stop(
+                    stop_event, _backoff_delay(0, STREAM_BACKOFF_BASE, STREAM_BACKOFF_CAP)
+                )
 
-                time.sleep(5)
+        logger.info("CrowdSec decision stream stopped")
 
 
 # Create global client instance
@@ -220,7 +407,10 @@ def get_client() -> CrowdSecClient:
     return _client
 
 
-def start_stream_listener() -> None:
-    """Start the stream listener (blocking)"""
+async def start_stream_listener(stop_event: Optional[asyncio.Event] = None) -> None:
+    """Run the stream listener until ``stop_event`` is set or the task is cancelled"""
     client = get_client()
-    client.stream_decisions()
+    try:
+        await client.stream_decisions(stop_event)
+    finally:
+        await client.close()
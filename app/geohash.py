@@ -0,0 +1,75 @@
+"""Geohash encoding for aggregating attack sources by area"""
+
+from typing import Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {char: index for index, char in enumerate(_BASE32)}
+
+
+def encode(latitude: float, longitude: float, precision: int = 7) -> str:
+    """
+    Encode a coordinate as a geohash string.
+
+    Truncating a geohash to fewer characters yields the enclosing (larger) cell,
+    so counts stored at one precision can be folded into any lower precision.
+    """
+    lat_low, lat_high = -90.0, 90.0
+    lon_low, lon_high = -180.0, 180.0
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_low + lon_high) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_low = mid
+            else:
+                bits <<= 1
+                lon_high = mid
+        else:
+            mid = (lat_low + lat_high) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_low = mid
+            else:
+                bits <<= 1
+                lat_high = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def decode(geohash: str) -> Tuple[float, float]:
+    """Decode a geohash string to the (latitude, longitude) of its cell center"""
+    lat_low, lat_high = -90.0, 90.0
+    lon_low, lon_high = -180.0, 180.0
+    even = True
+
+    for char in geohash:
+        value = _BASE32_INDEX[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_low + lon_high) / 2
+                if bit:
+                    lon_low = mid
+                else:
+                    lon_high = mid
+            else:
+                mid = (lat_low + lat_high) / 2
+                if bit:
+                    lat_low = mid
+                else:
+                    lat_high = mid
+            even = not even
+
+    return (lat_low + lat_high) / 2, (lon_low + lon_high) / 2
@@ -0,0 +1,80 @@
+"""Custom middleware"""
+
+from starlette.datastructures import Headers
+from starlette.middleware.cors import ALL_METHODS, CORSMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Header sent on every CORS response when any origin is allowed without credentials
+_ALLOW_ANY_ORIGIN = (b"access-control-allow-origin", b"*")
+
+
+class FrozenOriginCORSMiddleware(CORSMiddleware):
+    """
+    CORSMiddleware with the allowed origins stored in a frozenset.
+
+    Starlette checks ``origin in self.allow_origins`` for every CORS request;
+    with a frozenset that is a hash lookup instead of a list scan. The
+    Access-Control-* header values are already prebuilt by Starlette.
+    """
+
+    def __init__(self, app: ASGIApp, **kwargs) -> None:
+        super().__init__(app, **kwargs)
+        self.allow_origins = frozenset(self.allow_origins)
+
+
+class WildcardCORSMiddleware:
+    """
+    Minimal CORS middleware for ``CORS_ORIGINS=*`` without credentials.
+
+    Every response to a CORS request gets a static ``Access-Control-Allow-Origin: *``
+    header, and preflight requests are answered directly with prebuilt headers
+    allowing all methods and the requested headers. This matches Starlette's
+    CORSMiddleware for ``allow_origins=["*"]``, ``allow_methods=["*"]``,
+    ``allow_headers=["*"]`` and ``allow_credentials=False``, without its
+    per-request origin checks and header dict building.
+    """
+
+    PREFLIGHT_HEADERS = [
+        _ALLOW_ANY_ORIGIN,
+        (b"access-control-allow-methods", ", ".join(ALL_METHODS).encode("latin-1")),
+        (b"access-control-max-age", b"600"),
+        (b"content-type", b"text/plain; charset=utf-8"),
+        (b"content-length", b"2"),
+    ]
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if "origin" not in headers:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and "access-control-request-method" in headers:
+            await self.preflight_response(headers, send)
+            return
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), _ALLOW_ANY_ORIGIN]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    async def preflight_response(self, request_headers: Headers, send: Send) -> None:
+        """Answer a preflight request, allowing the requested headers"""
+        response_headers = list(self.PREFLIGHT_HEADERS)
+        requested_headers = request_headers.get("access-control-request-headers")
+        if requested_headers:
+            response_headers.append(
+                (b"access-control-allow-headers", requested_headers.encode("latin-1"))
+            )
+        await send(
+            {"type": "http.response.start", "status": 200, "headers": response_headers}
+        )
+        await send({"type": "http.response.body", "body": b"OK"})
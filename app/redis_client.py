@@ -1,44 +1,106 @@
 """Redis client for storing CrowdSec decisions"""
 
-import json
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
-
-import redis
-
+import math
+import time
+from collections import Counter
+from datetime import datetime
+from heapq import nlargest
+from operator import itemgetter
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+
+import orjson
+import redis.asyncio as aioredis
+from redis.asyncio.client import Pipeline
+
+from app import geohash
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 # Redis keys
 DECISIONS_HASH_KEY = "crowdsec:decisions:hash"  # Hash für einzelne Decisions mit eindeutiger ID (20s TTL)
+DECISIONS_RECENT_KEY = "crowdsec:decisions:recent"  # Sorted Set der neuesten Decision-IDs nach CrowdSec-ID (20s TTL)
 COUNTRY_HASH_KEY = "crowdsec:country:counts"    # Hash für Länderzählungen (24h TTL)
 TOTAL_ATTACKS_KEY = "crowdsec:total:attacks"    # Counter für alle Angriffe (persistent, kein TTL)
 UNIQUE_COUNTRIES_SET_KEY = "crowdsec:unique:countries"  # Set aller Länder (persistent, kein TTL)
-DECISIONS_HISTORY_LIST_KEY = "crowdsec:decisions:history"  # Sorted Set für historische Decisions mit Timestamp (7 Tage TTL)
+DECISIONS_HISTORY_LIST_KEY = "crowdsec:decisions:history"  # Sorted Set der historischen Decision-IDs mit Timestamp (7 Tage TTL)
+DECISIONS_HISTORY_PAYLOAD_KEY = "crowdsec:history:payload"  # Hash mit den Daten der historischen Decisions nach ID (7 Tage TTL)
+GEOHASH_COUNTS_KEY = "crowdsec:geo:gh7"  # Hash für Zählungen pro Geohash (Präzision 7, 24h TTL)
+COUNTRY_STATS_CACHE_KEY = "crowdsec:cache:country_stats"  # Gecachte Länderstatistik als JSON (3s TTL)
+
+# Number of decision IDs kept in the recent decisions sorted set
+RECENT_DECISIONS_SIZE = 20
+
+# Cache TTL for the aggregated country statistics in seconds
+COUNTRY_STATS_CACHE_TTL = 3
+
+# Geohash precision stored at ingest time (~150m cells); lower precisions are derived by truncation
+GEOHASH_PRECISION = 7
+
+
+def _encode_decision(decision_data: Dict[str, Any]) -> str:
+    """Serialize a decision as compact JSON for storage"""
+    return orjson.dumps(decision_data).decode()
+
+
+def _decode_decision(decision_json: str) -> Dict[str, Any]:
+    """
+    Parse a stored decision.
+
+    Timestamps are stored as epoch milliseconds and rendered as ISO 8601 in the
+    configured timezone here; older records already hold an ISO string.
+    """
+    decision_data = orjson.loads(decision_json)
+    timestamp = decision_data.get("timestamp")
+    if isinstance(timestamp, int):
+        decision_data["timestamp"] = datetime.fromtimestamp(
+            timestamp / 1000, settings.tz
+        ).isoformat()
+    return decision_data
+
+
+def parse_history_cursor(cursor: str) -> Tuple[float, Optional[str]]:
+    """
+    Split a history cursor ("score:decision_id") into score and decision ID.
+
+    Bare scores, as returned before the decision ID was added, are accepted
+    and resume after every decision with that score.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    score_str, separator, decision_id = cursor.partition(":")
+    score = float(score_str)
+    if not math.isfinite(score):
+        raise ValueError(f"Invalid history cursor: {cursor}")
+    return score, decision_id if separator else None
 
 
 class RedisClient:
     """Client for Redis operations"""
 
     def __init__(self):
-        """Initialize Redis connection"""
-        try:
-            self.redis_client = redis.Redis(
-                host=settings.redis_host,
-                port=settings.redis_port,
-                db=settings.redis_db,
-                password=settings.redis_password if settings.redis_password else None,
-                decode_responses=True,
-            )
-            # Test connection
-            self.redis_client.ping()
-            logger.info("Redis connection established")
-        except Exception as e:
-            logger.error(f"Failed to connect to Redis: {e}")
-            self.redis_client = None
-
-    def add_decision(self, decision_data: Dict[str, Any], decision_id: str) -> bool:
+        """Initialize Redis connections"""
+        # Async client backed by a shared connection pool; the process holds a
+        # single RedisClient (see get_redis_client), so this is the only pool
+        self.pool = aioredis.ConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_max_connections,
+            decode_responses=True,
+        )
+        self.redis = aioredis.Redis(connection_pool=self.pool)
+
+        # Liveness state, refreshed by the background health check task
+        self.healthy: bool = False
+        self.health_checked_at: Optional[float] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+        # time.monotonic() of the last EXPIRE sent per long-lived key (see _refresh_ttl)
+        self._ttl_refreshed_at: Dict[str, float] = {}
+
+    async def add_decision(self, decision_data: Dict[str, Any], decision_id: str) -> bool:
         """
         Add a new decision to Redis with a unique ID.
 
@@ -47,138 +109,254 @@ class RedisClient:
             decision_id: Unique identifier for this decision (from CrowdSec)
 
         Returns:
-            True if successful, False otherwise
+            True if the decision was new and stored, False otherwise
         """
+        return await self.add_decisions([(decision_id, decision_data)]) == 1
+
+    async def add_decisions(self, decisions: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Add a batch of new decisions to Redis in two round trips.
+
+        All decisions are claimed with HSETNX on the history payload hash in one
+        pipeline, so decision IDs already stored within the history retention
+        (7 days) are rejected by Redis and never counted twice, e.g. when the
+        newest alert is read again after a restart. The remaining writes
+        (decisions hash, counters, country and geohash data, history index) for
+        the new decisions are queued on a second pipeline.
+
+        Args:
+            decisions: List of (decision ID, decision object) tuples from CrowdSec
+
+        Returns:
+            Number of decisions that were new and stored
+        """
+        if not decisions:
+            return 0
+
         try:
-            if not self.redis_client:
-                logger.error("Redis client not initialized")
-                return False
+            encoded = [
+                (decision_id, decision_data, _encode_decision(decision_data))
+                for decision_id, decision_data in decisions
+            ]
+
+            # Claim decisions in the long-lived history payload hash, only if they are new
+            pipe = self.redis.pipeline(transaction=False)
+            for decision_id, _, decision_json in encoded:
+                pipe.hsetnx(DECISIONS_HISTORY_PAYLOAD_KEY, decision_id, decision_json)
+            stored = await pipe.execute(raise_on_error=False)
+
+            new_decisions = []
+            for (decision_id, decision_data, decision_json), result in zip(encoded, stored):
+                if isinstance(result, Exception):
+                    logger.error("Error storing decision %s: %s", decision_id, result)
+                elif not result:
+                    logger.debug("Decision with ID %s already stored, skipping", decision_id)
+                else:
+                    new_decisions.append((decision_id, decision_data, decision_json))
+            if not new_decisions:
+                return 0
+
+            pipe = self.redis.pipeline(transaction=False)
 
-            # Store decision in hash with unique ID as field
-            self.redis_client.hset(
+            # Store decisions in hash with unique ID as field (20 seconds TTL for the entire hash)
+            pipe.hset(
                 DECISIONS_HASH_KEY,
-                decision_id,
-                json.dumps(decision_data)
+                mapping={decision_id: decision_json for decision_id, _, decision_json in new_decisions},
             )
-            
-            # Set expiration to 20 seconds for the entire hash
-            self.redis_client.expire(DECISIONS_HASH_KEY, 20)
+            pipe.expire(DECISIONS_HASH_KEY, 20)
 
-            # Update persistent counter for total attacks (only count new decisions)
-            try:
-                self._increment_total_attacks()
-            except Exception as e:
-                logger.error(f"Failed to increment total attacks counter: {e}")
+            # Index the decisions in the capped recent decisions sorted set
+            self._add_to_recent(pipe, [decision_id for decision_id, _, _ in new_decisions])
 
-            # Update country counts and unique countries set
-            country = decision_data.get("cn")
-            if country:
-                try:
-                    self._increment_country_count(country)
-                    self._add_unique_country(country)
-                except Exception as e:
-                    logger.error(
-                        f"Failed to update country data for {country}: {e}"
-                    )
-
-            # Store decision in history with timestamp for pagination
-            try:
-                self._add_to_history(decision_id, decision_data)
-            except Exception as e:
-                logger.error(f"Failed to add decision to history: {e}")
+            for decision_id, decision_data, _ in new_decisions:
+                # Update persistent counter for total attacks (only count new decisions)
+                self._increment_total_attacks(pipe)
 
-            logger.debug(
-                f"Added decision with ID {decision_id} for country {decision_data.get('cn', 'unknown')}"
-            )
-            return True
+                # Update country counts and unique countries set
+                country = decision_data.get("cn")
+                if country:
+                    self._increment_country_count(pipe, country)
+                    self._add_unique_country(pipe, country)
+
+                # Update geohash cell counts for the heatmap
+                latitude = decision_data.get("latitude")
+                longitude = decision_data.get("longitude")
+                if isinstance(latitude, (int, float)) and isinstance(longitude, (int, float)):
+                    self._increment_geohash_count(pipe, latitude, longitude)
+
+                # Index decision in history with timestamp for pagination
+                self._add_to_history(pipe, decision_id)
+
+            results = await pipe.execute(raise_on_error=False)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Redis command failed while adding decisions: %s", result)
+
+            logger.debug("Added %d new decision(s)", len(new_decisions))
+            return len(new_decisions)
 
         except Exception as e:
-            logger.error(f"Error adding decision to Redis: {e}")
-            return False
+            logger.error("Error adding decisions to Redis: %s", e)
+            return 0
+
+    def _refresh_ttl(self, pipe: Pipeline, key: str, ttl: int) -> None:
+        """
+        Queue EXPIRE for a long-lived key unless it was sent within the last ttl/2 seconds.
+
+        The key then expires between ttl/2 and ttl seconds after the last write,
+        while a steady stream of decisions sends one EXPIRE per key every ttl/2
+        seconds instead of one per decision.
+        """
+        now = time.monotonic()
+        refreshed_at = self._ttl_refreshed_at.get(key)
+        if refreshed_at is not None and now - refreshed_at < ttl / 2:
+            return
+        self._ttl_refreshed_at[key] = now
+        pipe.expire(key, ttl)
+
+    def _add_to_recent(self, pipe: Pipeline, decision_ids: List[str]) -> None:
+        """
+        Queue adding the decision IDs to the recent decisions sorted set.
 
-    def _increment_total_attacks(self) -> None:
+        Implementation detail:
+        - Uses Redis Sorted Set with the CrowdSec ID as score and as member. IDs
+          only ever increase, so the order is newest first however close together
+          decisions were stored, and also within one batch
+        - Trimmed to the RECENT_DECISIONS_SIZE newest entries
+        - TTL = 20 seconds, same as the decisions hash
         """
-        Increment the persistent counter for total attacks.
+        scores: Dict[str, int] = {}
+        for decision_id in decision_ids:
+            try:
+                scores[decision_id] = int(decision_id)
+            except ValueError:
+                logger.warning("Decision ID %s is not numeric, not listed as recent", decision_id)
+        if not scores:
+            return
+        pipe.zadd(DECISIONS_RECENT_KEY, scores)
+        pipe.zremrangebyrank(DECISIONS_RECENT_KEY, 0, -(RECENT_DECISIONS_SIZE + 1))
+        pipe.expire(DECISIONS_RECENT_KEY, 20)
+
+    def _increment_total_attacks(self, pipe: Pipeline) -> None:
+        """
+        Queue the increment of the persistent counter for total attacks.
         
         Implementation detail:
         - Uses Redis STRING to store counter: TOTAL_ATTACKS_KEY = integer count
         - **NO TTL** - counter persists indefinitely
         - Increments by 1 for each new decision
         """
-        if not self.redis_client:
-            raise RuntimeError("Redis client not initialized")
-
         # Increment the persistent counter
-        self.redis_client.incr(TOTAL_ATTACKS_KEY)
-        logger.debug(f"Total attacks counter incremented")
+        pipe.incr(TOTAL_ATTACKS_KEY)
 
-    def _add_unique_country(self, country: str) -> None:
+    def _add_unique_country(self, pipe: Pipeline, country: str) -> None:
         """
-        Add country code to the set of unique countries.
+        Queue adding the country code to the set of unique countries.
         
         Implementation detail:
         - Uses Redis SET to store unique countries
         - **NO TTL** - set persists indefinitely
         - Automatically handles duplicates (set property)
         """
-        if not self.redis_client:
-            raise RuntimeError("Redis client not initialized")
-
         # Add country to set (duplicates are ignored)
-        self.redis_client.sadd(UNIQUE_COUNTRIES_SET_KEY, country)
-        logger.debug(f"Added country to unique set: {country}")
+        pipe.sadd(UNIQUE_COUNTRIES_SET_KEY, country)
 
-    def _increment_country_count(self, country: str) -> None:
+    def _increment_country_count(self, pipe: Pipeline, country: str) -> None:
         """
-        Increment the count for a country code in the country hash.
+        Queue the increment of the count for a country code in the country hash.
 
         Implementation detail:
         - Uses Redis HASH to store country counts: field = country code, value = count
         - Automatically creates entry if not exists
         - TTL = 24 hours
         """
-        if not self.redis_client:
-            raise RuntimeError("Redis client not initialized")
-
         # Increment the counter for this country
-        self.redis_client.hincrby(COUNTRY_HASH_KEY, country, 1)
+        pipe.hincrby(COUNTRY_HASH_KEY, country, 1)
         
         # Set expiration to 24 hours
-        self.redis_client.expire(COUNTRY_HASH_KEY, 86400)
+        self._refresh_ttl(pipe, COUNTRY_HASH_KEY, 86400)
+
+    def _increment_geohash_count(self, pipe: Pipeline, latitude: float, longitude: float) -> None:
+        """
+        Queue the increment of the count for the geohash cell containing the given coordinate.
+
+        Implementation detail:
+        - Uses Redis HASH: field = geohash (precision GEOHASH_PRECISION), value = count
+        - Lower zoom levels are computed on read by truncating the geohash
+        - TTL = 24 hours
+        """
+        cell = geohash.encode(latitude, longitude, precision=GEOHASH_PRECISION)
+        pipe.hincrby(GEOHASH_COUNTS_KEY, cell, 1)
+
+        # Set expiration to 24 hours
+        self._refresh_ttl(pipe, GEOHASH_COUNTS_KEY, 86400)
+
+    async def get_geohash_clusters(self, precision: int = 5, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get attack counts aggregated by geohash cell.
 
-    def get_latest_decisions(self, count: int = 20) -> List[Dict[str, Any]]:
+        Args:
+            precision: Geohash length to aggregate on (1-GEOHASH_PRECISION)
+            limit: Maximum number of clusters to return
+
+        Returns:
+            List of clusters sorted by count (descending):
+            [{"geohash": "u33dc", "latitude": ..., "longitude": ..., "count": 12}, ...]
+        """
+        try:
+            cell_counts = await self.redis.hgetall(GEOHASH_COUNTS_KEY)  # type: ignore[no-untyped-call]
+
+            clusters: Counter = Counter()
+            for cell, count_str in cell_counts.items():  # type: ignore[union-attr]
+                try:
+                    clusters[cell[:precision]] += int(count_str)
+                except (ValueError, TypeError):
+                    logger.warning(f"Invalid count for geohash {cell}: {count_str}")
+                    continue
+
+            result: List[Dict[str, Any]] = []
+            for cell, count in clusters.most_common(limit):
+                latitude, longitude = geohash.decode(cell)
+                result.append(
+                    {"geohash": cell, "latitude": latitude, "longitude": longitude, "count": count}
+                )
+            return result
+
+        except Exception as e:
+            logger.error(f"Error aggregating geohash clusters: {e}")
+            return []
+
+    async def get_latest_decisions(self, count: int = 20) -> List[Dict[str, Any]]:
         """
         Get the latest decisions from Redis as array of objects with ID as key.
 
+        The newest IDs are read from the recent decisions sorted set and only
+        those fields are fetched from the decisions hash, newest first.
+
         Args:
-            count: Number of decisions to return (default 20)
+            count: Number of decisions to return (default 20, max RECENT_DECISIONS_SIZE)
 
         Returns:
             List of decision objects in format [{"id": {...}}, {"id2": {...}}]
         """
         try:
-            if not self.redis_client:
-                logger.error("Redis client not initialized")
+            decision_ids: Any = await self.redis.zrevrange(  # type: ignore[no-untyped-call]
+                DECISIONS_RECENT_KEY, 0, min(count, RECENT_DECISIONS_SIZE) - 1
+            )
+            if not decision_ids:
                 return []
 
-            # Get all decisions from hash
-            all_decisions_dict = self.redis_client.hgetall(DECISIONS_HASH_KEY)  # type: ignore[no-untyped-call]
-            
-            if not all_decisions_dict:
-                return []
+            decisions_json: Any = await self.redis.hmget(DECISIONS_HASH_KEY, decision_ids)  # type: ignore[no-untyped-call]
 
             # Convert to list of single-key dicts: [{"id": data}, {"id2": data}, ...]
             result: List[Dict[str, Any]] = []
-            item_count = 0
-            decisions_items = list(all_decisions_dict.items())  # type: ignore[union-attr]
-            for decision_id, decision_json in decisions_items:
-                if item_count >= count:
-                    break
+            for decision_id, decision_json in zip(decision_ids, decisions_json):
+                if decision_json is None:
+                    continue
                 try:
-                    decision_data = json.loads(str(decision_json))
+                    decision_data = _decode_decision(str(decision_json))
                     result.append({decision_id: decision_data})
-                    item_count += 1
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     logger.warning(f"Failed to parse decision {decision_id}")
                     continue
             
@@ -188,150 +366,327 @@ class RedisClient:
             logger.error(f"Error retrieving decisions from Redis: {e}")
             return []
 
-    def _add_to_history(self, decision_id: str, decision_data: Dict[str, Any]) -> None:
+    def _add_to_history(self, pipe: Pipeline, decision_id: str) -> None:
         """
-        Add decision to history sorted set.
+        Queue adding the decision to the history.
         
         Implementation detail:
-        - Uses Redis Sorted Set with timestamp as score
-        - Stores decision as JSON with ID as member
+        - Uses Redis Sorted Set with timestamp as score and decision ID as member
+        - The decision JSON is already in the history payload hash (field = decision ID),
+          written by the HSETNX claim in add_decisions
         - TTL = 7 days for history
         """
-        if not self.redis_client:
-            raise RuntimeError("Redis client not initialized")
+        timestamp = time.time()  # Current timestamp as score
         
+        # Add to sorted set with timestamp as score
+        pipe.zadd(DECISIONS_HISTORY_LIST_KEY, {decision_id: timestamp})
+        
+        # Set expiration to 7 days (604800 seconds)
+        self._refresh_ttl(pipe, DECISIONS_HISTORY_LIST_KEY, 604800)
+        self._refresh_ttl(pipe, DECISIONS_HISTORY_PAYLOAD_KEY, 604800)
+
+    async def get_history_page(
+        self, limit: int = 100, offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        """
+        Get a page of decision history together with the total history size.
+
+        The first page sends ZREVRANGE and ZCARD in a single pipeline. For later
+        pages ZCARD runs first and ZREVRANGE is skipped entirely when the offset
+        is past the end of the history.
+
+        Args:
+            limit: Number of decisions to return (max 1000)
+            offset: Number of decisions to skip
+
+        Returns:
+            Tuple of (decisions in format [{"id": {...}}], total number of decisions
+            in history, cursor for the next page or None)
+        """
         try:
-            import time
-            timestamp = time.time()  # Current timestamp as score
-            
-            # Add to sorted set with timestamp as score
-            self.redis_client.zadd(
-                DECISIONS_HISTORY_LIST_KEY,
-                {f"{decision_id}:{json.dumps(decision_data)}": timestamp}
-            )
-            
-            # Set expiration to 7 days (604800 seconds)
-            self.redis_client.expire(DECISIONS_HISTORY_LIST_KEY, 604800)
-            logger.debug(f"Added decision {decision_id} to history")
+            # Clamp limit to reasonable value
+            limit = min(limit, 1000)
+
+            if offset > 0:
+                total = await self.redis.zcard(DECISIONS_HISTORY_LIST_KEY)
+                if offset >= int(total or 0):
+                    return [], int(total or 0), None
+                history_items = await self.redis.zrevrange(
+                    DECISIONS_HISTORY_LIST_KEY, offset, offset + limit - 1, withscores=True
+                )
+            else:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.zrevrange(DECISIONS_HISTORY_LIST_KEY, offset, offset + limit - 1, withscores=True)
+                pipe.zcard(DECISIONS_HISTORY_LIST_KEY)
+                history_items, total = await pipe.execute()
+
+            decisions, next_cursor = await self._load_scored_history_items(history_items)
+            return decisions, int(total) if total else 0, next_cursor
+
         except Exception as e:
-            logger.error(f"Failed to add decision to history: {e}")
-            raise
+            logger.error(f"Error retrieving decision history page: {e}")
+            return [], 0, None
 
-    def get_decision_history(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+    async def get_decision_history_by_cursor(
+        self, cursor: Optional[str], limit: int = 100
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
         """
-        Get paginated decision history from Redis sorted set.
-        
+        Get a page of decision history older than the given cursor.
+
+        Uses ZREVRANGEBYSCORE with an inclusive upper bound on the score (the
+        insertion timestamp), so Redis seeks directly to the cursor instead of
+        walking ``offset`` elements as ZREVRANGE does for deep pages. Decisions
+        sharing the cursor's score are returned in reverse member order, so the
+        ones up to and including the cursor's decision ID are skipped; the range
+        is extended by the number of such ties (ZCOUNT) to still fill the page.
+
         Args:
+            cursor: ``next_cursor`` of the previous page (None starts at the newest)
             limit: Number of decisions to return (max 1000)
-            offset: Number of decisions to skip
-        
+
         Returns:
-            List of decision objects in format [{"id": {...}}, {"id2": {...}}]
+            Tuple of (decisions in format [{"id": {...}}], total number of decisions
+            in history, cursor for the next page or None)
         """
         try:
-            if not self.redis_client:
-                logger.error("Redis client not initialized")
-                return []
-            
             # Clamp limit to reasonable value
             limit = min(limit, 1000)
-            
-            # Get range from sorted set (reversed to get newest first)
-            # ZREVRANGE returns from highest to lowest score
-            history_items: Any = self.redis_client.zrevrange(  # type: ignore[no-untyped-call]
-                DECISIONS_HISTORY_LIST_KEY,
-                offset,
-                offset + limit - 1,
-                withscores=False
-            )
-            
-            if not history_items:
-                return []
-            
-            result: List[Dict[str, Any]] = []
-            for item in history_items:  # type: ignore[union-attr]
-                try:
-                    # Parse the stored format: "id:json_data"
-                    item_str = str(item)
-                    if ":" in item_str:
-                        decision_id, decision_json = item_str.split(":", 1)
-                        decision_data = json.loads(decision_json)
-                        result.append({decision_id: decision_data})
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.warning(f"Failed to parse history item: {e}")
-                    continue
-            
-            return result
-        
+
+            if cursor is None:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.zrevrangebyscore(
+                    DECISIONS_HISTORY_LIST_KEY, "+inf", "-inf", start=0, num=limit, withscores=True
+                )
+                pipe.zcard(DECISIONS_HISTORY_LIST_KEY)
+                history_items, total = await pipe.execute()
+            else:
+                score, last_id = parse_history_cursor(cursor)
+
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.zcount(DECISIONS_HISTORY_LIST_KEY, score, score)
+                pipe.zcard(DECISIONS_HISTORY_LIST_KEY)
+                ties, total = await pipe.execute()
+
+                history_items = await self.redis.zrevrangebyscore(
+                    DECISIONS_HISTORY_LIST_KEY,
+                    score,
+                    "-inf",
+                    start=0,
+                    num=limit + int(ties or 0),
+                    withscores=True,
+                )
+                # Drop the decisions at the cursor's score that were already returned
+                history_items = [
+                    (member, member_score)
+                    for member, member_score in history_items
+                    if member_score != score or (last_id is not None and member < last_id)
+                ][:limit]
+
+            decisions, next_cursor = await self._load_scored_history_items(history_items)
+            return decisions, int(total) if total else 0, next_cursor
+
         except Exception as e:
-            logger.error(f"Error retrieving decision history: {e}")
+            logger.error(f"Error retrieving decision history by cursor: {e}")
+            return [], 0, None
+
+    async def iter_history(
+        self, limit: int = 100, offset: int = 0, chunk: int = 100
+    ) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """
+        Iterate over a page of decision history in chunks.
+
+        Each chunk is fetched with its own ZREVRANGE, so at most ``chunk``
+        decisions are held in memory at a time. Errors end the iteration early
+        and are logged, since the response may already be partially sent.
+
+        Args:
+            limit: Number of decisions to return (max 1000)
+            offset: Number of decisions to skip
+            chunk: Maximum number of decisions fetched per Redis call
+
+        Yields:
+            Tuple of (decisions in format [{"id": {...}}], cursor after this chunk)
+        """
+        # Clamp limit to reasonable value
+        end = offset + min(limit, 1000)
+        start = offset
+        try:
+            while start < end:
+                stop = min(start + chunk, end) - 1
+                history_items: Any = await self.redis.zrevrange(  # type: ignore[no-untyped-call]
+                    DECISIONS_HISTORY_LIST_KEY, start, stop, withscores=True
+                )
+                if not history_items:
+                    return
+                yield await self._load_scored_history_items(history_items)
+                if len(history_items) <= stop - start:
+                    return
+                start = stop + 1
+        except Exception as e:
+            logger.error(f"Error streaming decision history: {e}")
+
+    async def _load_scored_history_items(
+        self, history_items: Any
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Load (member, score) pairs and return the decisions plus the cursor of the last one"""
+        if not history_items:
+            return [], None
+
+        decisions = await self._load_history_items([member for member, _ in history_items])
+        last_member, last_score = history_items[-1]
+        return decisions, f"{float(last_score)!r}:{last_member}"
+
+    async def get_etag(self, key: str) -> Optional[str]:
+        """
+        Build a weak ETag for data derived from the given key.
+
+        Combines the total attacks counter, which is incremented for every new
+        decision, with the existence of ``key`` so that a TTL expiry (e.g. the
+        20s decisions hash) also changes the tag.
+
+        Returns:
+            Weak ETag string, or None if Redis could not be queried
+        """
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(TOTAL_ATTACKS_KEY)
+            pipe.exists(key)
+            total_attacks, exists = await pipe.execute()
+            return self._format_etag(total_attacks, exists)
+        except Exception as e:
+            logger.error(f"Error building ETag for {key}: {e}")
+            return None
+
+    @staticmethod
+    def _format_etag(total_attacks: Any, exists: Any) -> str:
+        """Format the weak ETag from the total attacks counter and key existence"""
+        return f'W/"{total_attacks or 0}-{int(exists)}"'
+
+    async def _load_history_items(self, history_items: Any) -> List[Dict[str, Any]]:
+        """
+        Fetch the payloads for history sorted set members into [{"id": {...}}].
+
+        Members are decision IDs whose data is read with a single HMGET from the
+        history payload hash. Entries written before the payload hash existed
+        still carry the data in the member ("id:json_data") and are parsed directly.
+        """
+        if not history_items:
             return []
 
-    def get_history_count(self) -> int:
+        members = [str(item) for item in history_items]  # type: ignore[union-attr]
+        payloads: Any = await self.redis.hmget(DECISIONS_HISTORY_PAYLOAD_KEY, members)  # type: ignore[no-untyped-call]
+
+        result: List[Dict[str, Any]] = []
+        for member, decision_json in zip(members, payloads):
+            try:
+                decision_id = member
+                if decision_json is None:
+                    # Legacy format: "id:json_data"
+                    if ":" not in member:
+                        continue
+                    decision_id, decision_json = member.split(":", 1)
+                decision_data = _decode_decision(str(decision_json))
+                result.append({decision_id: decision_data})
+            except (orjson.JSONDecodeError, ValueError) as e:
+                logger.warning(f"Failed to parse history item: {e}")
+                continue
+
+        return result
+
+    async def get_history_count(self) -> int:
         """Get total number of decisions in history"""
         try:
-            if not self.redis_client:
-                return 0
-            
-            count: Any = self.redis_client.zcard(DECISIONS_HISTORY_LIST_KEY)  # type: ignore[no-untyped-call]
+            count: Any = await self.redis.zcard(DECISIONS_HISTORY_LIST_KEY)  # type: ignore[no-untyped-call]
             return int(count) if count else 0
         except Exception as e:
             logger.error(f"Error getting history count: {e}")
             return 0
 
-    def clear_all(self) -> bool:
+    async def clear_all(self) -> bool:
         """Clear all data from Redis"""
         try:
-            if not self.redis_client:
-                return False
-            self.redis_client.delete(
+            await self.redis.delete(
                 DECISIONS_HASH_KEY,
+                DECISIONS_RECENT_KEY,
                 COUNTRY_HASH_KEY,
                 TOTAL_ATTACKS_KEY,
                 UNIQUE_COUNTRIES_SET_KEY,
-                DECISIONS_HISTORY_LIST_KEY
+                DECISIONS_HISTORY_LIST_KEY,
+                DECISIONS_HISTORY_PAYLOAD_KEY,
+                GEOHASH_COUNTS_KEY,
+                COUNTRY_STATS_CACHE_KEY,
             )
+            self._ttl_refreshed_at.clear()
             logger.info("Cleared all decisions, country counts, and metrics from Redis")
             return True
         except Exception as e:
             logger.error(f"Error clearing Redis: {e}")
             return False
 
-    def get_decisions_by_country(self):
+    async def get_decisions_by_country(
+        self, top: Optional[int] = None
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
         """
         Get aggregated country counts from Redis hash with metadata.
 
+        The aggregated result is cached in Redis for COUNTRY_STATS_CACHE_TTL seconds,
+        so dashboards polling this endpoint are served by a single GET. The ETag
+        of the data the result was built from is cached with it, so a cached
+        (possibly slightly stale) body is never sent with a newer ETag.
+
+        Args:
+            top: Only return the ``top`` countries with the most attacks (None = all)
+
         Returns:
-            Dict with status, metadata (total_attacks, unique_countries, attacks_per_hour), 
-            and countries list sorted by count (descending)
+            Tuple of (dict with status, metadata (total_attacks, unique_countries,
+            attacks_per_hour) and countries list sorted by count (descending),
+            ETag matching that result or None)
         """
+        cache_key = COUNTRY_STATS_CACHE_KEY if top is None else f"{COUNTRY_STATS_CACHE_KEY}:top{top}"
         try:
-            if not self.redis_client:
-                logger.error("Redis client not initialized")
-                return {
-                    "status": "error",
-                    "message": "Redis client not initialized",
-                }
+            cached = await self.redis.get(cache_key)
+            if cached:
+                entry = orjson.loads(cached)
+                return entry["result"], entry["etag"]
+        except Exception as e:
+            logger.warning(f"Failed to read cached country stats: {e}")
+
+        result, etag = await self._aggregate_decisions_by_country(top)
+
+        if result.get("status") == "success":
+            try:
+                await self.redis.set(
+                    cache_key,
+                    orjson.dumps({"etag": etag, "result": result}),
+                    ex=COUNTRY_STATS_CACHE_TTL,
+                )
+            except Exception as e:
+                logger.warning(f"Failed to cache country stats: {e}")
+
+        return result, etag
+
+    async def _aggregate_decisions_by_country(
+        self, top: Optional[int] = None
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Build the country statistics and their ETag from the country hash and persistent metrics"""
+        try:
+            # Fetch country counts, persistent metrics and the ETag inputs in a single round trip
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hgetall(COUNTRY_HASH_KEY)
+            pipe.get(TOTAL_ATTACKS_KEY)
+            pipe.scard(UNIQUE_COUNTRIES_SET_KEY)
+            pipe.exists(COUNTRY_HASH_KEY)
+            country_counts, total_attacks_str, unique_countries_count, exists = await pipe.execute()
+            etag = self._format_etag(total_attacks_str, exists)
 
-            # Get all country counts from hash
-            country_counts = self.redis_client.hgetall(COUNTRY_HASH_KEY)  # type: ignore[no-untyped-call]
-            
-            # Get persistent metrics
             total_attacks = 0
-            total_attacks_str = self.redis_client.get(TOTAL_ATTACKS_KEY)  # type: ignore[no-untyped-call]
             if total_attacks_str:
                 try:
                     total_attacks = int(str(total_attacks_str))
                 except (ValueError, TypeError):
                     total_attacks = 0
             
-            unique_countries = 0
-            unique_countries_set = self.redis_client.smembers(UNIQUE_COUNTRIES_SET_KEY)  # type: ignore[no-untyped-call]
-            if unique_countries_set:
-                try:
-                    unique_countries = len(list(unique_countries_set))  # type: ignore[arg-type]
-                except (TypeError, ValueError):
-                    unique_countries = 0
+            unique_countries = int(unique_countries_count or 0)
             
             # Calculate attacks per hour (total / 24)
             attacks_per_hour = total_attacks // 24 if total_attacks > 0 else 0
@@ -348,34 +703,73 @@ class RedisClient:
                     "status": "success",
                     "metadata": metadata,
                     "countries": []
-                }
+                }, etag
 
-            # Convert to list of {"country_code": count} dicts and sort by count descending
-            countries_list = []
-            items_list = list(country_counts.items())  # type: ignore[union-attr]
-            for country, count_str in items_list:
+            # Collect (country_code, count) pairs
+            pairs = []
+            for country, count_str in country_counts.items():  # type: ignore[union-attr]
                 try:
-                    count = int(count_str)
-                    countries_list.append({country: count})
+                    pairs.append((country, int(count_str)))
                 except (ValueError, TypeError):
                     logger.warning(f"Invalid count for country {country}: {count_str}")
                     continue
-            
-            # Sort by count (value) in descending order
-            countries_list.sort(key=lambda x: list(x.values())[0], reverse=True)
+
+            # Sort by count in descending order (partial selection when only the top N is needed)
+            if top is not None and top < len(pairs):
+                pairs = nlargest(top, pairs, key=itemgetter(1))
+            else:
+                pairs.sort(key=itemgetter(1), reverse=True)
+
+            # Convert to list of {"country_code": count} dicts
+            countries_list = [{country: count} for country, count in pairs]
 
             return {
                 "status": "success",
                 "metadata": metadata,
                 "countries": countries_list
-            }
+            }, etag
 
         except Exception as e:
             logger.error(f"Error aggregating decisions by country: {e}")
             return {
                 "status": "error",
                 "message": "An internal error occurred"
-            }
+            }, None
+
+    def start_health_check(self, interval: float = 1.0) -> None:
+        """
+        Start the background task that pings Redis and updates the liveness flag.
+
+        Must be called from a running event loop (e.g. the FastAPI lifespan).
+        """
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop(interval))
+
+    async def _health_loop(self, interval: float) -> None:
+        """Ping Redis every ``interval`` seconds and record the result"""
+        while True:
+            try:
+                await self.redis.ping()
+                if not self.healthy:
+                    logger.info("Redis health check succeeded")
+                self.healthy = True
+            except Exception as e:
+                if self.healthy:
+                    logger.error(f"Redis health check failed: {e}")
+                self.healthy = False
+            self.health_checked_at = time.time()
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        """Stop the health check task and close the async connection pool"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        try:
+            await self.pool.aclose()
+        except Exception as e:
+            logger.error(f"Error closing Redis connection pool: {e}")
 
 
 # Global Redis client instance
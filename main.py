@@ -3,19 +3,29 @@ Main FastAPI Application Entry Point
 Sec-Dash-Backend - CrowdSec Data Analysis Backend
 """
 
+import asyncio
+import hashlib
 import logging
-import threading
+import queue
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from logging.handlers import QueueHandler, QueueListener
+from typing import IO, Optional, Tuple
+from fastapi import APIRouter, Depends, FastAPI, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
+import orjson
 import os
 import time
 
+try:
+    import fcntl
+except ImportError:
+    # Windows has no fcntl; the stream listener lock is skipped there
+    fcntl = None
+
 # Import settings for timezone
 from app.config import settings
+from app.middleware import FrozenOriginCORSMiddleware, WildcardCORSMiddleware
 
 # Load environment variables
 load_dotenv()
@@ -30,48 +40,202 @@ except Exception:
     # Windows does not support tzset; zoneinfo will be used for datetime operations
     pass
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+
+def configure_logging() -> QueueHandler:
+    """
+    Route root logger records through a queue to a stderr QueueListener thread,
+    so logging calls on the event loop never block on the stream handler's lock or I/O.
+
+    Safe to call more than once: ``python main.py`` runs this module as __main__
+    and uvicorn then imports it again as main, which must not add a second handler.
+
+    Returns:
+        The root QueueHandler, its QueueListener is set as ``listener``
+    """
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers:
+        if isinstance(handler, QueueHandler):
+            return handler
+
+    # Timestamps without the ",mmm" millisecond suffix
+    logging.Formatter.default_msec_format = None
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+    )
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.listener = QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(logging.INFO)
+    queue_handler.listener.start()
+    return queue_handler
+
+
+def shutdown_logging(queue_handler: QueueHandler) -> None:
+    """
+    Flush queued log records and stop the listener thread. The stream handler is
+    attached to the root logger directly first, so records logged afterwards
+    (uvicorn's shutdown messages) are still written.
+    """
+    root_logger = logging.getLogger()
+    if queue_handler not in root_logger.handlers:
+        return
+    root_logger.removeHandler(queue_handler)
+    for handler in queue_handler.listener.handlers:
+        root_logger.addHandler(handler)
+    queue_handler.listener.stop()
+
+
+log_queue_handler = configure_logging()
+
 logger = logging.getLogger(__name__)
 
-# Rate limiting
-limiter = Limiter(key_func=get_remote_address)
+from app.api.rate_limit import TokenBucketLimiter, rate_limit
+from app.api.caching import etag_matches, not_modified_response
+from app.redis_client import get_redis_client
+
+# Interactive docs and the OpenAPI schema are only served outside production
+DOCS_URL = None if settings.is_production else "/docs"
+
+# Static root endpoint payload, serialized once
+ROOT_BODY = orjson.dumps(
+    {"message": "Welcome to Sectacho API", "version": "0.1.0", "docs": DOCS_URL}
+)
+ROOT_ETAG = f'"{hashlib.md5(ROOT_BODY).hexdigest()}"'
+ROOT_CACHE_CONTROL = "public, max-age=3600"
+ROOT_HEADERS = {"ETag": ROOT_ETAG, "Cache-Control": ROOT_CACHE_CONTROL}
+
+
+def acquire_stream_lock() -> Tuple[bool, Optional[IO[str]]]:
+    """
+    Try to become the owner of the CrowdSec stream listener.
 
-# Import routers
-from app.api import alerts, health, country
+    Takes a non-blocking exclusive flock on settings.stream_lock_file, so with several
+    uvicorn workers only the first one to start polls CrowdSec. The returned
+    file must stay open for as long as the listener runs; the lock is released
+    when it is closed or the process exits.
 
-# Stream listener thread reference
-stream_thread = None
+    If the lock file cannot be opened (read-only filesystem, missing directory)
+    or flock is unavailable, the listener runs without the lock. Several
+    listeners then poll CrowdSec, which is safe since decisions are deduplicated
+    by ID in Redis.
+
+    Returns:
+        (owns_listener, lock_file) - lock_file is None when no lock is held
+    """
+    try:
+        lock_file = open(settings.stream_lock_file, "a+")
+    except OSError as e:
+        logger.warning(
+            "Cannot open stream lock file %s (%s), running the listener without the lock",
+            settings.stream_lock_file,
+            e,
+        )
+        return True, None
+    if fcntl is None:
+        lock_file.close()
+        return True, None
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        # The owner wrote its pid into the file after taking the lock
+        lock_file.seek(0)
+        owner_pid = lock_file.read().strip() or "unknown"
+        lock_file.close()
+        logger.info(
+            "CrowdSec stream listener is owned by another worker (pid %s)", owner_pid
+        )
+        return False, None
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    return True, lock_file
 
 
-def start_stream_listener():
-    """Start CrowdSec stream listener in background thread"""
+# Seconds to wait for the stream listener to finish its current poll on shutdown
+STREAM_SHUTDOWN_TIMEOUT = 25
+
+
+async def start_stream_listener(stop_event: asyncio.Event):
+    """Run CrowdSec stream listener as a background task"""
     from app.crowdsec_client import start_stream_listener
 
     logger.info("Starting CrowdSec decision stream listener...")
     try:
-        start_stream_listener()
+        await start_stream_listener(stop_event)
     except Exception as e:
-        logger.error(f"Stream listener error: {e}")
+        logger.error("Stream listener error: %s", e)
+
+
+def register_routers(app: FastAPI) -> None:
+    """Import the API routers and mount them under a single /api/v1 router"""
+    from app.api import alerts, health, country
+
+    api_v1 = APIRouter(prefix="/api/v1", dependencies=[Depends(rate_limit)])
+    api_v1.include_router(health.router, tags=["health"])
+    api_v1.include_router(alerts.router, tags=["decisions"])
+    api_v1.include_router(country.router, tags=["country"])
+    app.include_router(api_v1)
+
+    # Rebuild the OpenAPI schema with the new routes on next request
+    app.openapi_schema = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown events"""
-    global stream_thread
-
     logger.info("Application starting...")
 
-    # Start stream listener in background thread
-    stream_thread = threading.Thread(target=start_stream_listener, daemon=True)
-    stream_thread.start()
-    logger.info("CrowdSec stream listener started in background")
+    # Routers are imported and registered at startup rather than at module import
+    register_routers(app)
+
+    # Create the shared Redis client (and its connection pool) once per process
+    app.state.redis_client = get_redis_client()
+    app.state.redis_client.start_health_check()
+
+    # Start stream listener as a task on the event loop, in one worker only
+    app.state.stream_task = None
+    app.state.stream_lock = None
+    app.state.stream_stop = asyncio.Event()
+    if not settings.run_stream_listener:
+        logger.info("CrowdSec stream listener disabled (RUN_STREAM_LISTENER is off)")
+    else:
+        owns_listener, app.state.stream_lock = acquire_stream_lock()
+        if owns_listener:
+            app.state.stream_task = asyncio.create_task(
+                start_stream_listener(app.state.stream_stop)
+            )
+            logger.info(
+                "CrowdSec stream listener started in background (pid %s)", os.getpid()
+            )
 
     yield
 
     logger.info("Application shutting down...")
-    # Thread will auto-exit as daemon
+    if app.state.stream_task is not None:
+        # Let the listener finish its current poll, cancel it if that takes too long
+        app.state.stream_stop.set()
+        done, _ = await asyncio.wait(
+            {app.state.stream_task}, timeout=STREAM_SHUTDOWN_TIMEOUT
+        )
+        if not done:
+            logger.warning(
+                "Stream listener did not stop within %ss, cancelling",
+                STREAM_SHUTDOWN_TIMEOUT,
+            )
+            app.state.stream_task.cancel()
+        await asyncio.gather(app.state.stream_task, return_exceptions=True)
+    if app.state.stream_lock is not None:
+        app.state.stream_lock.close()
+    await app.state.redis_client.close()
+
+    shutdown_logging(log_queue_handler)
 
 
 # Create FastAPI app
@@ -79,39 +243,70 @@ app = FastAPI(
     title="Sectacho API",
     description="CrowdSec Decision Stream Management",
     version="0.1.0",
+    openapi_url=None if settings.is_production else "/openapi.json",
+    docs_url=DOCS_URL,
+    redoc_url=None if settings.is_production else "/redoc",
     lifespan=lifespan,
 )
 
-# Add state limiter
-app.state.limiter = limiter
+# Rate limiting: in-process token bucket per client IP
+app.state.limiter = None
+if settings.rate_limit_per_second > 0:
+    app.state.limiter = TokenBucketLimiter(
+        rate=settings.rate_limit_per_second, capacity=settings.rate_limit_burst
+    )
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=os.getenv("CORS_ORIGINS", "*").split(","),
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Compress JSON responses (repeated keys compress well). Added before CORS, so CORS is the
+# outer middleware: preflights are answered uncompressed and its headers go on gzipped bodies.
+# Level 5 keeps most of the ratio of the default 9 at a fraction of the CPU.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
-# Include routers
-app.include_router(health.router, prefix="/api/v1", tags=["health"])
-app.include_router(alerts.router, prefix="/api/v1", tags=["decisions"])
-app.include_router(country.router, prefix="/api/v1", tags=["country"])
+# CORS middleware; a wide-open API without credentials only needs static headers
+if settings.cors_origin_list == ("*",) and not settings.cors_allow_credentials:
+    app.add_middleware(WildcardCORSMiddleware)
+else:
+    app.add_middleware(
+        FrozenOriginCORSMiddleware,
+        allow_origins=settings.cors_origin_list,
+        allow_credentials=settings.cors_allow_credentials,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Root endpoint"""
-    return {"message": "Welcome to Sectacho API", "version": "0.1.0", "docs": "/docs"}
+    if etag_matches(request, ROOT_ETAG):
+        return not_modified_response(ROOT_ETAG, ROOT_CACHE_CONTROL)
+    return Response(
+        content=ROOT_BODY, media_type="application/json", headers=ROOT_HEADERS
+    )
 
 
 if __name__ == "__main__":
     import uvicorn
 
+    # uvloop is not available on Windows; fall back to the default asyncio loop there
+    try:
+        import uvloop  # noqa: F401
+
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+
+    # Worker processes; (2 x CPU cores) + 1 is a good starting point for this I/O-bound API.
+    # Reload only works with a single worker.
+    workers = settings.api_workers
+
     uvicorn.run(
         "main:app",
-        host=os.getenv("API_HOST", "0.0.0.0"),
-        port=int(os.getenv("API_PORT", 8000)),
-        reload=os.getenv("DEBUG", "False") == "True",
+        host=settings.api_host,
+        port=settings.api_port,
+        loop=loop,
+        http="httptools",
+        workers=workers,
+        timeout_graceful_shutdown=30,
+        timeout_keep_alive=5,
+        reload=workers == 1 and settings.debug,
     )